@@ -1,8 +1,22 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import asyncio
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
-import json
+import ijson
+import orjson
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+import hashlib
+import http.cookiejar
+import io
+import random
+import string
+import threading
 import time
 
 # Page configuration
@@ -40,208 +54,530 @@ with st.sidebar.expander("API Settings", expanded=True):
         help="Server key from Admin Panel"
     )
 
+# Base URL for API endpoints, built once per script run
+API_BASE_URL = f"{site_url.rstrip('/')}/api/"
+
 # Helper functions
-def make_api_request(endpoint, post_data=None, retries=3):
+@st.cache_resource
+def get_http_session():
+    """Create a pooled HTTP session shared across requests and reruns"""
+    session = requests.Session()
+    # The session is shared by every browser session, so never keep cookies
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        'User-Agent': 'WooWonder-Data-Extractor/1.0',
+        'Accept-Encoding': 'gzip, deflate'
+    })
+    return session
+
+SESSION = get_http_session()
+
+class RateLimiter:
+    """Pace API requests from rate limit headers and a sliding request window"""
+    
+    def __init__(self, requests_per_minute=None, min_remaining_ratio=0.1,
+                 initial_concurrency=8, max_concurrency=16,
+                 increase_step=1, decrease_factor=0.5):
+        self.requests_per_minute = requests_per_minute
+        self.min_remaining_ratio = min_remaining_ratio
+        self.timestamps = deque()
+        self.remaining = None
+        self.limit = None
+        self.reset_at = None
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+        
+        # AIMD concurrency controller for concurrent fetches
+        self.concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.congested = False
+    
+    @staticmethod
+    def retry_after(headers):
+        """Parse a Retry-After header into seconds, or None if absent"""
+        value = headers.get('Retry-After') if headers else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    
+    def _reserve(self):
+        """Return how long to wait before sending, reserving a slot when ready"""
+        with self.lock:
+            now = time.monotonic()
+            while self.timestamps and now - self.timestamps[0] >= 60:
+                self.timestamps.popleft()
+            
+            delay = self.blocked_until - now
+            
+            # Sliding window: never exceed requests_per_minute, when one is configured
+            if self.requests_per_minute and len(self.timestamps) >= self.requests_per_minute:
+                delay = max(delay, self.timestamps[0] + 60 - now)
+            
+            if self.reset_at is not None and now >= self.reset_at:
+                self.remaining = None
+                self.reset_at = None
+            
+            # Proactive pause when the server reports a nearly exhausted quota
+            if self.remaining is not None and self.limit:
+                if self.remaining < self.limit * self.min_remaining_ratio:
+                    if self.reset_at is not None:
+                        delay = max(delay, self.reset_at - now)
+                    else:
+                        # Without a reset time, pause once and wait for fresh headers
+                        self.blocked_until = max(self.blocked_until, now + 1.0)
+                        self.remaining = None
+                        self.limit = None
+                        delay = max(delay, self.blocked_until - now)
+            
+            if delay <= 0:
+                self.timestamps.append(now)
+                if self.remaining is not None:
+                    self.remaining -= 1
+                return 0.0
+            return delay
+    
+    def wait_if_throttled(self):
+        """Block until a request may be sent"""
+        while (delay := self._reserve()) > 0:
+            time.sleep(delay)
+    
+    async def wait_if_throttled_async(self):
+        """Asynchronously wait until a request may be sent"""
+        while (delay := self._reserve()) > 0:
+            await asyncio.sleep(delay)
+    
+    def record(self, headers, status_code=None):
+        """Update quota state from a response's status and headers"""
+        with self.lock:
+            now = time.monotonic()
+            
+            try:
+                if headers.get('X-RateLimit-Limit') is not None:
+                    self.limit = int(headers['X-RateLimit-Limit'])
+                if headers.get('X-RateLimit-Remaining') is not None:
+                    self.remaining = int(headers['X-RateLimit-Remaining'])
+                if headers.get('X-RateLimit-Reset') is not None:
+                    reset = float(headers['X-RateLimit-Reset'])
+                    # Some servers send an epoch timestamp, others a delta in seconds
+                    if reset > 1e9:
+                        reset -= time.time()
+                    self.reset_at = now + max(0.0, reset)
+            except ValueError:
+                pass
+            
+            if self.reset_at is not None and now >= self.reset_at:
+                self.remaining = None
+                self.reset_at = None
+            
+            if status_code is not None and (status_code == 429 or status_code >= 500):
+                self.congested = True
+                retry_after = self.retry_after(headers)
+                if retry_after is not None:
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+    
+    def adjust_concurrency(self):
+        """Additive increase on clean waves, multiplicative decrease on 429/5xx"""
+        with self.lock:
+            if self.congested:
+                self.concurrency = max(1, int(self.concurrency * self.decrease_factor))
+            else:
+                self.concurrency = min(self.max_concurrency, self.concurrency + self.increase_step)
+            self.congested = False
+            return self.concurrency
+
+@st.cache_resource
+def get_rate_limiter(site_url):
+    """Create a rate limiter per site, shared across requests and reruns"""
+    return RateLimiter()
+
+RATE_LIMITER = get_rate_limiter(site_url.rstrip('/'))
+
+class RetryScheduler:
+    """Schedule retries from the recent 429 ratio instead of blind doubling"""
+    
+    def __init__(self, base_delay=1.0, max_delay=8.0, congestion_weight=4.0, window=32):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.congestion_weight = congestion_weight
+        self.outcomes = deque(maxlen=window)
+        self.retry_after = None
+        self.lock = threading.Lock()
+    
+    def record(self, status_code=None, headers=None):
+        """Record a response outcome; status_code is None for network errors"""
+        with self.lock:
+            if status_code is None:
+                outcome = 'error'
+            elif status_code == 429:
+                outcome = '429'
+            elif status_code >= 500:
+                outcome = '5xx'
+            elif status_code >= 400:
+                outcome = '4xx'
+            else:
+                outcome = 'success'
+            self.outcomes.append(outcome)
+            
+            # Remember the latest Retry-After so delays never overshoot it
+            if outcome == '429':
+                self.retry_after = RateLimiter.retry_after(headers)
+            elif outcome == 'success':
+                self.retry_after = None
+    
+    def next_delay(self):
+        """Jittered delay scaled by the share of recent 429 responses"""
+        with self.lock:
+            p_congestion = self.outcomes.count('429') / len(self.outcomes) if self.outcomes else 0.0
+            ceiling = self.max_delay
+            if self.retry_after is not None:
+                ceiling = min(ceiling, self.retry_after)
+        delay = self.base_delay * (1 + p_congestion * self.congestion_weight) * random.uniform(0.5, 1.5)
+        return min(ceiling, delay)
+
+@st.cache_resource
+def get_retry_scheduler(site_url):
+    """Create a retry scheduler per site, shared across requests and reruns"""
+    return RetryScheduler()
+
+RETRY_SCHEDULER = get_retry_scheduler(site_url.rstrip('/'))
+
+# Number of user batches fetched concurrently
+USER_FETCH_WORKERS = 8
+
+def _request_api(endpoint, post_data=None, retries=3):
     """Make API request to WooWonder with retry logic"""
+    url = f"{API_BASE_URL}{endpoint}?access_token={access_token}"
+    if post_data:
+        # Build a new dict once rather than mutating the caller's on every attempt
+        post_data = {**post_data, 'server_key': server_key}
+    
     for attempt in range(retries):
         try:
-            url = f"{site_url.rstrip('/')}/api/{endpoint}?access_token={access_token}"
-            
+            RATE_LIMITER.wait_if_throttled()
             if post_data:
-                post_data['server_key'] = server_key
-                response = requests.post(url, data=post_data, timeout=30)
+                response = SESSION.post(url, data=post_data, timeout=30)
             else:
-                response = requests.get(url, timeout=30)
+                response = SESSION.get(url, timeout=30)
+            RATE_LIMITER.record(response.headers, response.status_code)
+            RETRY_SCHEDULER.record(response.status_code, response.headers)
             
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
             
         except requests.exceptions.RequestException as e:
             if attempt == retries - 1:
                 st.error(f"API request failed after {retries} attempts: {str(e)}")
                 return None
-            time.sleep(2 ** attempt)  # Exponential backoff
+            if e.response is None:
+                RETRY_SCHEDULER.record()
+            time.sleep(RETRY_SCHEDULER.next_delay())
             
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             st.error("Invalid JSON response from API")
             return None
     
     return None
 
-def extract_author_info(author_data):
-    """Extract author username and email from author field"""
-    if not author_data:
-        return None, None
+class _UncacheableResponse(Exception):
+    """Carries a failed API result out of the cache so it is not memoized"""
     
-    # If author_data is a string, try to parse it as JSON
-    if isinstance(author_data, str):
+    def __init__(self, result):
+        super().__init__("API request did not succeed")
+        self.result = result
+
+def _hash_secret(secret):
+    """Hash a credential so it can key the cache without being stored"""
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+@st.cache_data(ttl=300, show_spinner=False, max_entries=128)
+def _cached_api(site_url, access_token_hash, server_key_hash, endpoint, post_data_items, retries):
+    """Cache successful API responses keyed on site, hashed credentials and request params"""
+    result = _request_api(endpoint, dict(post_data_items), retries)
+    if not result or result.get('api_status') != 200:
+        raise _UncacheableResponse(result)
+    return result
+
+def make_api_request(endpoint, post_data=None, retries=3):
+    """Make API request to WooWonder, serving repeated requests from cache"""
+    post_data_items = tuple(sorted((post_data or {}).items()))
+    try:
+        return _cached_api(
+            site_url,
+            _hash_secret(access_token),
+            _hash_secret(server_key),
+            endpoint,
+            post_data_items,
+            retries
+        )
+    except _UncacheableResponse as e:
+        return e.result
+
+def parse_nested_field(value):
+    """Parse a nested field that the API may send as a JSON string"""
+    if isinstance(value, str):
         try:
-            author_data = json.loads(author_data)
-        except json.JSONDecodeError:
-            return None, None
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return value
+    return value
+
+@ijson.coroutine
+def _articles_page_sink(page):
+    """Collect api_status and each article from parser events as they complete"""
+    builder = None
+    while True:
+        prefix, event, value = (yield)
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == 'articles.item' and event == 'end_map':
+                page['articles'].append(builder.value)
+                builder = None
+        elif prefix == 'articles.item' and event == 'start_map':
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+        elif prefix == 'api_status':
+            # Keep the raw value; callers check it against 200
+            page['api_status'] = value
+
+async def _fetch_page(session, url, offset, limit, post_data, retries=3):
+    """Fetch a single page of articles"""
+    page_data = {**post_data, 'offset': offset, 'limit': limit}
     
-    # If it's a dictionary, extract username and email
-    if isinstance(author_data, dict):
-        username = author_data.get('username', '')
-        email = author_data.get('email', '')
-        return username, email
+    for attempt in range(retries):
+        try:
+            await RATE_LIMITER.wait_if_throttled_async()
+            async with session.post(url, data=page_data) as response:
+                RATE_LIMITER.record(response.headers, response.status)
+                RETRY_SCHEDULER.record(response.status, response.headers)
+                response.raise_for_status()
+                
+                # Stream-parse the body so only one article is being built at a time
+                page = {'articles': []}
+                parser = ijson.parse_coro(_articles_page_sink(page), use_float=True)
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    parser.send(chunk)
+                parser.close()
+                return page
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if not isinstance(e, aiohttp.ClientResponseError):
+                RETRY_SCHEDULER.record()
+            if attempt == retries - 1:
+                return None
+            await asyncio.sleep(RETRY_SCHEDULER.next_delay())
+        except ijson.JSONError:
+            return None
     
-    return None, None
+    return None
 
-def bulk_fetch_articles(post_data, total_limit, progress_callback=None):
-    """Fetch articles in bulk by paginating through API"""
-    all_articles = []
-    current_offset = post_data.get('offset', 0)
+async def bulk_fetch_articles_async(post_data, total_limit, progress_callback=None):
+    """Fetch articles in bulk by requesting pages concurrently in waves"""
+    start_offset = int(post_data.get('offset', 0))
     api_limit = min(1000, post_data.get('limit', 1000))  # API max is 1000
     
-    total_fetched = 0
-    page = 1
+    # Total is known up front, so every (offset, limit) page can be computed at once
+    pages = [
+        (start_offset + page_start, min(api_limit, total_limit - page_start))
+        for page_start in range(0, total_limit, api_limit)
+    ]
+    url = f"{API_BASE_URL}get-articles?access_token={access_token}"
+    base_post_data = {**post_data, 'server_key': server_key}
     
-    while total_fetched < total_limit:
-        # Calculate how many to fetch in this request
-        remaining = total_limit - total_fetched
-        current_limit = min(api_limit, remaining)
-        
-        # Prepare request data
-        current_post_data = post_data.copy()
-        current_post_data['limit'] = current_limit
-        current_post_data['offset'] = current_offset + total_fetched
-        
+    connector = aiohttp.TCPConnector(limit_per_host=64)
+    timeout = aiohttp.ClientTimeout(total=30)
+    completed = 0
+    
+    async def fetch_and_report(session, page_offset, page_limit):
+        nonlocal completed
+        result = await _fetch_page(session, url, page_offset, page_limit, base_post_data)
+        completed += 1
         if progress_callback:
-            progress_callback(f"Fetching page {page} (offset {current_post_data['offset']}, limit {current_limit})")
-        
-        # Make API request
-        result = make_api_request('get-articles', current_post_data)
-        
-        if result and result.get('api_status') == 200:
-            articles_batch = result.get('articles', [])
-            
-            if not articles_batch:
-                # No more articles available
-                break
-            
-            all_articles.extend(articles_batch)
-            total_fetched += len(articles_batch)
+            progress_callback(f"Fetched {completed}/{len(pages)} pages (offset {page_offset}, limit {page_limit})")
+        return result
+    
+    all_articles = []
+    page = 0
+    
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=SESSION.headers) as session:
+        # Dispatch one page per concurrency slot, so the AIMD controller
+        # can shrink or grow the next wave after any 429/5xx
+        while page < len(pages):
+            wave = pages[page:page + RATE_LIMITER.concurrency]
+            results = await asyncio.gather(*[
+                fetch_and_report(session, page_offset, page_limit)
+                for page_offset, page_limit in wave
+            ])
+            RATE_LIMITER.adjust_concurrency()
             
-            # If we got fewer articles than requested, we've reached the end
-            if len(articles_batch) < current_limit:
-                break
+            # Reassemble in page order, stopping where the serial walk would have stopped
+            for (page_offset, page_limit), result in zip(wave, results):
+                page += 1
+                if not (result and result.get('api_status') == 200):
+                    st.error(f"Failed to fetch page {page}. Stopping bulk fetch.")
+                    return all_articles
                 
-        else:
-            st.error(f"Failed to fetch page {page}. Stopping bulk fetch.")
-            break
-        
-        page += 1
-        time.sleep(1)  # Rate limiting between requests
+                articles_batch = result.get('articles', [])
+                all_articles.extend(articles_batch)
+                
+                # If we got fewer articles than requested, we've reached the end
+                if len(articles_batch) < page_limit:
+                    return all_articles
     
     return all_articles
 
+def bulk_fetch_articles(post_data, total_limit, progress_callback=None):
+    """Fetch articles in bulk by paginating through API"""
+    return asyncio.run(bulk_fetch_articles_async(post_data, total_limit, progress_callback))
+
+class _ColumnNameTable(dict):
+    """str.translate table mapping anything outside [a-zA-Z0-9_] to '_'"""
+    
+    def __missing__(self, codepoint):
+        return '_'
+
+_CLEAN_COLUMN_NAME = _ColumnNameTable(
+    (ord(c), c) for c in string.ascii_letters + string.digits + '_'
+)
+
+def add_readable_timestamps(df, date_fields):
+    """Add a <field>_readable column for each unix timestamp column present"""
+    for date_field in date_fields:
+        if date_field in df.columns:
+            timestamps = pd.to_numeric(df[date_field], errors='coerce').where(lambda ts: ts > 0)
+            df[f'{date_field}_readable'] = pd.to_datetime(timestamps, unit='s', errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S')
+    return df
+
 def process_articles_data(articles_data):
     """Process articles data to extract author information and flatten nested fields"""
-    processed_articles = []
-    
+    # The author field sometimes arrives as a JSON string rather than an object;
+    # parse it in place since the fetched records are not reused elsewhere
     for article in articles_data:
-        processed_article = article.copy()
-        
-        # Extract author information
-        author_data = article.get('author', {})
-        author_username, author_email = extract_author_info(author_data)
-        
-        processed_article['author_username'] = author_username
-        processed_article['author_email'] = author_email
-        
-        # Flatten author data if it's a dict
-        if isinstance(author_data, dict):
-            for key, value in author_data.items():
-                if key not in ['username', 'email']:  # Don't duplicate
-                    processed_article[f'author_{key}'] = value
-        
-        # Process other nested fields
-        if 'category' in article and isinstance(article['category'], dict):
-            category_data = article['category']
-            processed_article['category_name'] = category_data.get('name', '')
-            processed_article['category_id'] = category_data.get('id', '')
-        
-        # Convert timestamps to readable format
-        for date_field in ['time', 'created_at', 'updated_at']:
-            if date_field in processed_article and processed_article[date_field]:
-                try:
-                    timestamp = int(processed_article[date_field])
-                    processed_article[f'{date_field}_readable'] = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
-                except (ValueError, TypeError):
-                    pass
-        
-        processed_articles.append(processed_article)
+        if isinstance(article.get('author'), str):
+            article['author'] = parse_nested_field(article['author'])
+    
+    # Flatten author, category and other nested objects into prefixed columns
+    df = pd.json_normalize(articles_data, sep='_', max_level=1)
     
-    return processed_articles
+    # Convert timestamps to readable format
+    return add_readable_timestamps(df, ['time', 'created_at', 'updated_at'])
 
 def process_users_data(users_data):
     """Process users data to flatten nested fields"""
-    processed_users = []
-    
+    # Notification settings are usually sent as a JSON string; parse in place
     for user in users_data:
-        processed_user = user.copy()
-        
-        # Flatten details field
-        if 'details' in user and isinstance(user['details'], dict):
-            details = user['details']
-            for key, value in details.items():
-                processed_user[f'details_{key}'] = value
-        
-        # Process notification settings
-        if 'notification_settings' in user:
-            try:
-                if isinstance(user['notification_settings'], str):
-                    notification_settings = json.loads(user['notification_settings'])
-                else:
-                    notification_settings = user['notification_settings']
-                
-                for key, value in notification_settings.items():
-                    processed_user[f'notification_{key}'] = value
-            except (json.JSONDecodeError, TypeError):
-                pass
-        
-        # Convert timestamps to readable format
-        for date_field in ['lastseen', 'last_data_update', 'point_day_expire']:
-            if date_field in processed_user and processed_user[date_field]:
-                try:
-                    timestamp = int(processed_user[date_field])
-                    processed_user[f'{date_field}_readable'] = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
-                except (ValueError, TypeError):
-                    pass
-        
-        processed_users.append(processed_user)
+        if isinstance(user.get('notification_settings'), str):
+            user['notification_settings'] = parse_nested_field(user['notification_settings'])
+    
+    # Flatten details and notification settings into prefixed columns
+    df = pd.json_normalize(users_data, sep='_', max_level=1)
+    df = df.rename(columns={
+        col: 'notification_' + col[len('notification_settings_'):]
+        for col in df.columns if col.startswith('notification_settings_')
+    })
     
-    return processed_users
+    # Convert timestamps to readable format
+    return add_readable_timestamps(df, ['lastseen', 'last_data_update', 'point_day_expire'])
+
+def summarize_users(df):
+    """Compute user summary statistics once per fetch"""
+    return {
+        'active_users': int(df['active'].eq('1').sum()) if 'active' in df.columns else 0,
+        'verified_users': int(df['verified'].eq('1').sum()) if 'verified' in df.columns else 0
+    }
+
+def summarize_articles(df):
+    """Compute article summary statistics once per fetch"""
+    has_authors = 'author_username' in df.columns
+    return {
+        'unique_authors': df['author_username'].nunique() if has_authors else 0,
+        'unique_categories': df['category_name'].nunique() if 'category_name' in df.columns else 0,
+        'top_authors': df['author_username'].value_counts().head(10) if has_authors else None
+    }
 
-def export_to_csv(data, filename, process_func=None):
+def build_csv_bytes(df):
+    """Encode a DataFrame as gzip-compressed CSV"""
+    # Write in chunks rather than materialising one large string
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False, compression='gzip', chunksize=10000)
+    return buffer.getvalue()
+
+def clean_column_names(df):
+    """Replace characters outside [a-zA-Z0-9_] in column names with '_'"""
+    df.columns = [str(col).translate(_CLEAN_COLUMN_NAME) for col in df.columns]
+    return df
+
+def export_to_csv(data, filename, process_func=None, csv_bytes=None):
     """Export data to CSV with optional processing and provide download link"""
-    if data:
+    if data is not None and len(data) > 0:
         # Process data if processing function is provided
         if process_func:
-            data = process_func(data)
-        
-        df = pd.DataFrame(data)
+            df = process_func(data)
+        elif isinstance(data, pd.DataFrame):
+            df = data
+        else:
+            df = pd.DataFrame(data)
         
         # Clean column names
-        df.columns = df.columns.str.replace('[^a-zA-Z0-9_]', '_', regex=True)
+        df = clean_column_names(df)
+        
+        if csv_bytes is None:
+            csv_bytes = build_csv_bytes(df)
         
-        csv = df.to_csv(index=False)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename_with_timestamp = f"{filename}_{timestamp}.csv"
+        filename_with_timestamp = f"{filename}_{timestamp}.csv.gz"
         
         st.download_button(
             label=f"📥 Download {filename_with_timestamp}",
-            data=csv,
+            data=csv_bytes,
             file_name=filename_with_timestamp,
-            mime="text/csv",
+            mime="application/gzip",
             key=f"download_{filename}_{timestamp}"
         )
         
         return df
     return None
 
-def display_data_preview(df, data_type="Data"):
+# Maximum number of rows rendered in the data preview
+PREVIEW_ROW_LIMIT = 500
+
+def build_search_text(df):
+    """Join each row's values into one lowercase string for substring search"""
+    # A NUL separator keeps a search term from matching across two columns;
+    # newer pandas keeps missing values as NaN after astype(str), so blank them
+    text = pd.Series('', index=df.index)
+    for col in df.columns:
+        text = text + df[col].astype(str).fillna('') + '\x00'
+    return text.str.lower()
+
+# Columns selected first in the preview, author fields ahead of other important ones
+PRIORITY_COLUMNS = (
+    'author_username', 'author_email',
+    'id', 'title', 'content', 'username', 'email', 'name', 'first_name', 'last_name'
+)
+
+@st.cache_data(show_spinner=False)
+def _default_columns(columns):
+    """Pick up to 10 preview columns, priority columns first"""
+    available = set(columns)
+    priority_columns = [col for col in PRIORITY_COLUMNS if col in available]
+    
+    # Fill remaining slots with other columns
+    selected = set(priority_columns)
+    remaining_columns = [col for col in columns if col not in selected]
+    return priority_columns + remaining_columns[:10-len(priority_columns)]
+
+def display_data_preview(df, data_type="Data", search_text=None):
     """Display enhanced data preview with filtering options"""
     st.subheader(f"📋 {data_type} Preview")
     
@@ -250,7 +586,9 @@ def display_data_preview(df, data_type="Data"):
     
     if search_term:
         # Search across all string columns
-        mask = df.astype(str).apply(lambda x: x.str.contains(search_term, case=False, na=False)).any(axis=1)
+        if search_text is None:
+            search_text = build_search_text(df)
+        mask = search_text.str.contains(search_term.lower(), regex=False, na=False)
         filtered_df = df[mask]
         st.info(f"Showing {len(filtered_df)} results for '{search_term}'")
     else:
@@ -260,23 +598,7 @@ def display_data_preview(df, data_type="Data"):
     all_columns = list(df.columns)
     if len(all_columns) > 10:
         # Prioritize author fields and other important columns
-        priority_columns = []
-        
-        # Always include author fields if available
-        if 'author_username' in all_columns:
-            priority_columns.append('author_username')
-        if 'author_email' in all_columns:
-            priority_columns.append('author_email')
-        
-        # Add other important columns
-        important_columns = ['id', 'title', 'content', 'username', 'email', 'name', 'first_name', 'last_name']
-        for col in important_columns:
-            if col in all_columns and col not in priority_columns:
-                priority_columns.append(col)
-        
-        # Fill remaining slots with other columns
-        remaining_columns = [col for col in all_columns if col not in priority_columns]
-        default_columns = priority_columns + remaining_columns[:10-len(priority_columns)]
+        default_columns = _default_columns(tuple(all_columns))
         
         selected_columns = st.multiselect(
             f"Select columns to display (author fields selected by default)",
@@ -289,7 +611,11 @@ def display_data_preview(df, data_type="Data"):
     
     # Display data
     if selected_columns:
-        st.dataframe(filtered_df[selected_columns], use_container_width=True, height=400)
+        # Only send a window of rows to the browser; the download has everything
+        preview = filtered_df[selected_columns].head(PREVIEW_ROW_LIMIT)
+        if len(filtered_df) > len(preview):
+            st.caption(f"Showing first {len(preview)} of {len(filtered_df)} rows")
+        st.dataframe(preview, use_container_width=True, height=400)
     else:
         st.warning("Please select at least one column to display")
 
@@ -329,47 +655,69 @@ else:
                 
                 all_users_data = []
                 
-                # Process in batches
-                for i in range(0, len(user_ids), batch_size):
-                    batch_ids = user_ids[i:i+batch_size]
-                    batch_ids_str = ','.join(batch_ids)
-                    
-                    status_text.text(f"Processing batch {i//batch_size + 1}/{(len(user_ids)-1)//batch_size + 1}")
-                    
-                    post_data = {'user_ids': batch_ids_str}
-                    result = make_api_request('get-many-users-data', post_data)
+                # Process batches concurrently; each request is still paced by the rate limiter
+                batches = [user_ids[i:i+batch_size] for i in range(0, len(user_ids), batch_size)]
+                batch_results = [None] * len(batches)
+                ctx = get_script_run_ctx()
+                
+                with ThreadPoolExecutor(
+                    max_workers=USER_FETCH_WORKERS,
+                    initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+                ) as executor:
+                    futures = {
+                        executor.submit(make_api_request, 'get-many-users-data', {'user_ids': ','.join(batch)}): index
+                        for index, batch in enumerate(batches)
+                    }
                     
+                    for completed, future in enumerate(as_completed(futures), start=1):
+                        batch_results[futures[future]] = future.result()
+                        status_text.text(f"Processed batch {completed}/{len(batches)}")
+                        progress_bar.progress(completed / len(batches))
+                
+                # Keep users in the order their IDs were entered
+                for result in batch_results:
                     if result and result.get('api_status') == 200:
                         batch_users = result.get('users', [])
                         all_users_data.extend(batch_users)
-                    
-                    progress_bar.progress((i + batch_size) / len(user_ids))
-                    time.sleep(0.5)  # Rate limiting
                 
                 if all_users_data:
                     st.success(f"✅ Successfully fetched {len(all_users_data)} users")
                     
-                    # Process and display data
-                    df = export_to_csv(all_users_data, "woowonder_users", process_users_data)
-                    
-                    if df is not None:
-                        display_data_preview(df, "Users")
-                        
-                        # Show summary statistics
-                        st.subheader("📊 Summary")
-                        col1, col2, col3, col4 = st.columns(4)
-                        with col1:
-                            st.metric("Total Users", len(all_users_data))
-                        with col2:
-                            st.metric("Columns", len(df.columns))
-                        with col3:
-                            st.metric("Active Users", len(df[df['active'] == '1']) if 'active' in df.columns else 0)
-                        with col4:
-                            st.metric("Verified Users", len(df[df['verified'] == '1']) if 'verified' in df.columns else 0)
+                    # Process once and keep the result across reruns
+                    users_df = clean_column_names(process_users_data(all_users_data))
+                    st.session_state['users_df'] = users_df
+                    st.session_state['users_summary'] = summarize_users(users_df)
+                    st.session_state['users_search'] = build_search_text(users_df)
+                    st.session_state['users_csv'] = build_csv_bytes(users_df)
                 else:
+                    st.session_state.pop('users_df', None)
+                    st.session_state.pop('users_summary', None)
+                    st.session_state.pop('users_search', None)
+                    st.session_state.pop('users_csv', None)
                     st.warning("No users data found")
             else:
                 st.error("Please enter valid user IDs")
+        
+        # Display the last fetched users until the next fetch
+        users_df = st.session_state.get('users_df')
+        if users_df is not None:
+            df = export_to_csv(users_df, "woowonder_users", csv_bytes=st.session_state.get('users_csv'))
+            
+            if df is not None:
+                display_data_preview(df, "Users", st.session_state.get('users_search'))
+                
+                # Show summary statistics
+                summary = st.session_state['users_summary']
+                st.subheader("📊 Summary")
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Total Users", len(df))
+                with col2:
+                    st.metric("Columns", len(df.columns))
+                with col3:
+                    st.metric("Active Users", summary['active_users'])
+                with col4:
+                    st.metric("Verified Users", summary['verified_users'])
     
     with tab2:
         st.header("📰 Articles Data Extraction")
@@ -493,39 +841,54 @@ else:
                     if articles_data:
                         st.success(f"✅ Successfully fetched {len(articles_data)} articles")
                         
-                        # Process and display data
-                        df = export_to_csv(articles_data, "woowonder_articles", process_articles_data)
+                        # Process once and keep the result across reruns
+                        articles_df = clean_column_names(process_articles_data(articles_data))
+                        st.session_state['articles_df'] = articles_df
+                        st.session_state['articles_summary'] = summarize_articles(articles_df)
+                        st.session_state['articles_search'] = build_search_text(articles_df)
+                        st.session_state['articles_csv'] = build_csv_bytes(articles_df)
                         
-                        if df is not None:
-                            display_data_preview(df, "Articles")
-                            
-                            # Show summary statistics
-                            st.subheader("📊 Summary")
-                            col1, col2, col3, col4 = st.columns(4)
-                            with col1:
-                                st.metric("Total Articles", len(articles_data))
-                            with col2:
-                                st.metric("Columns", len(df.columns))
-                            with col3:
-                                unique_authors = df['author_username'].nunique() if 'author_username' in df.columns else 0
-                                st.metric("Unique Authors", unique_authors)
-                            with col4:
-                                unique_categories = df['category_name'].nunique() if 'category_name' in df.columns else 0
-                                st.metric("Unique Categories", unique_categories)
-                            
-                            # Author statistics
-                            if 'author_username' in df.columns:
-                                st.subheader("👥 Author Statistics")
-                                author_stats = df.groupby('author_username').size().sort_values(ascending=False)
-                                st.bar_chart(author_stats.head(10))
-                            
-                            # Show fetch performance info
-                            if is_bulk_export:
-                                st.info(f"📈 Bulk export completed! Fetched {len(articles_data)} articles using automatic pagination.")
+                        # Show fetch performance info
+                        if is_bulk_export:
+                            st.info(f"📈 Bulk export completed! Fetched {len(articles_data)} articles using automatic pagination.")
                     else:
+                        st.session_state.pop('articles_df', None)
+                        st.session_state.pop('articles_summary', None)
+                        st.session_state.pop('articles_search', None)
+                        st.session_state.pop('articles_csv', None)
                         st.warning("No articles data found")
                 else:
+                    st.session_state.pop('articles_df', None)
+                    st.session_state.pop('articles_summary', None)
+                    st.session_state.pop('articles_search', None)
+                    st.session_state.pop('articles_csv', None)
                     st.error("Failed to fetch articles data. Please check your API configuration.")
+        
+        # Display the last fetched articles until the next fetch
+        articles_df = st.session_state.get('articles_df')
+        if articles_df is not None:
+            df = export_to_csv(articles_df, "woowonder_articles", csv_bytes=st.session_state.get('articles_csv'))
+            
+            if df is not None:
+                display_data_preview(df, "Articles", st.session_state.get('articles_search'))
+                
+                # Show summary statistics
+                summary = st.session_state['articles_summary']
+                st.subheader("📊 Summary")
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Total Articles", len(df))
+                with col2:
+                    st.metric("Columns", len(df.columns))
+                with col3:
+                    st.metric("Unique Authors", summary['unique_authors'])
+                with col4:
+                    st.metric("Unique Categories", summary['unique_categories'])
+                
+                # Author statistics
+                if summary['top_authors'] is not None:
+                    st.subheader("👥 Author Statistics")
+                    st.bar_chart(summary['top_authors'])
     
     with tab3:
         st.header("📊 Analytics Dashboard")